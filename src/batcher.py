@@ -0,0 +1,110 @@
+"""
+Cross-session request batching.
+Collects work items from concurrent tracks and hands them to the GPU as one job.
+"""
+import asyncio
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncBatcher:
+    """Groups concurrently submitted items into batches run on an executor."""
+    
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], List[Any]],
+        executor: Executor,
+        max_batch: int = 8,
+        window: float = 0.004
+    ):
+        """
+        Initialize batcher.
+        
+        Args:
+            process_batch: Blocking function mapping a list of items to a
+                list of results in the same order
+            executor: Executor the batches run on
+            max_batch: Maximum number of items per batch
+            window: Seconds to wait for more items once the first one of a
+                batch has arrived
+        """
+        self.process_batch = process_batch
+        self.executor = executor
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result.
+        
+        Args:
+            item: Work item passed to process_batch
+            
+        Returns:
+            The result process_batch produced for this item
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+    
+    async def stop(self):
+        """Stop the batching task and fail any items still waiting."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+    
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Wait for one item, then gather more until the batch or window is full."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _run(self):
+        """Run batches one after another, so the GPU sees back-to-back work."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.process_batch, items)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                # The submitter may have been cancelled meanwhile
+                if not future.done():
+                    future.set_result(result)
+
@@ -3,8 +3,29 @@ Configuration management for GPU Node.
 Handles environment variables and settings.
 """
 import os
-from typing import Optional
-from dataclasses import dataclass
+import functools
+from typing import Optional, Tuple
+from dataclasses import dataclass, fields
+
+
+def _as_bool(value: str) -> bool:
+    """Parse a boolean environment value such as 1/true/yes/on."""
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _as_size(value: str) -> Tuple[int, int]:
+    """Parse a WIDTHxHEIGHT environment value such as 320x240."""
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+# Parsers for the field types read from the environment; others stay str
+_PARSERS = {
+    int: int,
+    float: float,
+    bool: _as_bool,
+    Tuple[int, int]: _as_size,
+}
 
 
 @dataclass
@@ -12,42 +33,62 @@ class Config:
     """Configuration class for GPU Node."""
     
     # Server settings
-    host: str = os.getenv("HOST", "0.0.0.0")
-    port: int = int(os.getenv("PORT", "8080"))
+    host: str = "0.0.0.0"
+    port: int = 8080
     
     # WebRTC settings
-    webrtc_port: int = int(os.getenv("WEBRTC_PORT", "8081"))
-    stun_server: str = os.getenv("STUN_SERVER", "stun:stun.l.google.com:19302")
+    webrtc_port: int = 8081
+    stun_server: str = "stun:stun.l.google.com:19302"
     
     # Model settings
-    model_path: str = os.getenv("MODEL_PATH", "/app/models")
-    model_type: str = os.getenv("MODEL_TYPE", "insightface")  # insightface or deepfacelive
+    model_path: str = "/app/models"
+    model_type: str = "insightface"  # insightface or deepfacelive
     
     # GPU settings
-    gpu_id: int = int(os.getenv("GPU_ID", "0"))
-    batch_size: int = int(os.getenv("BATCH_SIZE", "1"))
+    gpu_id: int = 0
+    batch_size: int = 1  # max frames per batched swap
+    enable_batching: bool = False  # batch swaps across concurrent sessions
+    use_tensorrt: bool = False  # requires TensorRT libs in the image
+    swapper_precision: str = "fp32"  # fp32, fp16 or int8 (TensorRT only)
+    infer_workers: int = 1  # threads running per-frame processing
     
     # Face swap settings
-    swap_threshold: float = float(os.getenv("SWAP_THRESHOLD", "0.5"))
-    face_detection_threshold: float = float(os.getenv("FACE_DETECTION_THRESHOLD", "0.5"))
+    swap_threshold: float = 0.5
+    face_detection_threshold: float = 0.5
+    detection_size: Tuple[int, int] = (320, 240)  # detector input (width, height)
+    detect_interval: int = 5  # frames between detector runs while tracking
     
     # Orchestrator settings
-    orchestrator_url: Optional[str] = os.getenv("ORCHESTRATOR_URL", None)
-    node_id: Optional[str] = os.getenv("NODE_ID", None)
+    orchestrator_url: Optional[str] = None
+    node_id: Optional[str] = None
+    signaling_long_poll_timeout: int = 30  # seconds
     
     # Health check settings
-    health_check_interval: int = int(os.getenv("HEALTH_CHECK_INTERVAL", "30"))
+    health_check_interval: int = 30
     
     # Session settings
-    max_sessions: int = int(os.getenv("MAX_SESSIONS", "1"))
-    idle_timeout: int = int(os.getenv("IDLE_TIMEOUT", "300"))  # 5 minutes
+    max_sessions: int = 1
+    idle_timeout: int = 300  # 5 minutes
     
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def from_env(cls) -> "Config":
-        """Create config from environment variables."""
-        return cls()
+        """
+        Create config from environment variables.
+        
+        Each field is read from the upper-cased variable of the same name
+        (e.g. port from PORT); unset variables keep the field's default.
+        The environment is read once, in a single pass; later calls return
+        the same cached instance.
+        """
+        env = os.environ
+        values = {}
+        for field in fields(cls):
+            value = env.get(field.name.upper())
+            if value is not None:
+                values[field.name] = _PARSERS.get(field.type, str)(value)
+        return cls(**values)
 
 
 # Global config instance
 config = Config.from_env()
-
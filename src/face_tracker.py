@@ -0,0 +1,147 @@
+"""
+Lightweight face tracking between detector runs.
+Follows one face with an IOU match on detection frames and constant-velocity prediction in between.
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _iou(a: np.ndarray, b: np.ndarray) -> float:
+    """Intersection over union of two [x1, y1, x2, y2] boxes."""
+    ix = min(a[2], b[2]) - max(a[0], b[0])
+    iy = min(a[3], b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return float(inter / union) if union > 0 else 0.0
+
+
+class IOUTracker:
+    """Tracks a single face across frames from periodic detections."""
+    
+    def __init__(self, iou_threshold: float = 0.3):
+        """
+        Initialize tracker.
+        
+        Args:
+            iou_threshold: Minimum IOU between the predicted box and a
+                detection for the detection to continue the track
+        """
+        self.iou_threshold = iou_threshold
+        self._face: Optional[dict] = None
+        self._bbox: Optional[np.ndarray] = None  # float [x1, y1, x2, y2]
+        self._velocity = np.zeros(2, dtype=np.float32)  # box shift per frame
+        self._frames_since_update = 0
+        self._frame_size: Optional[Tuple[int, int]] = None
+    
+    @property
+    def lost(self) -> bool:
+        """Whether there is no face being tracked."""
+        return self._face is None
+    
+    def reset(self):
+        """Drop the current track."""
+        self._face = None
+        self._bbox = None
+        self._velocity[:] = 0
+        self._frames_since_update = 0
+    
+    @property
+    def frame_size(self) -> Optional[Tuple[int, int]]:
+        """Size (width, height) of the frames the track's coordinates refer to."""
+        return self._frame_size
+    
+    def set_frame_size(self, size: Tuple[int, int]) -> bool:
+        """
+        Tell the tracker the size of the current frame.
+        
+        Boxes and keypoints are in pixels, so a track from frames of another
+        size (e.g. after the sender changed resolution) is dropped.
+        
+        Args:
+            size: Frame size (width, height)
+            
+        Returns:
+            True if the size changed and the track was reset
+        """
+        if size == self._frame_size:
+            return False
+        self._frame_size = size
+        self.reset()
+        return True
+    
+    def update(self, detections: List[dict]) -> Optional[dict]:
+        """
+        Update the track with a fresh set of detections.
+        
+        The detection overlapping the predicted box best continues the
+        track. Without a track, the most confident detection starts one.
+        
+        Args:
+            detections: Face dictionaries from SwapEngine.detect_faces
+            
+        Returns:
+            The tracked face, or None if it was lost
+        """
+        if not detections:
+            self.reset()
+            return None
+        
+        if self._face is None:
+            best = max(detections, key=lambda face: face['det_score'])
+            self._start(best)
+            return self._face
+        
+        # This detection is for the frame after the last predicted one
+        elapsed = self._frames_since_update + 1
+        predicted = self._bbox + np.tile(self._velocity * elapsed, 2)
+        scores = [_iou(predicted, face['bbox']) for face in detections]
+        best_index = int(np.argmax(scores))
+        if scores[best_index] < self.iou_threshold:
+            logger.debug("Tracked face lost")
+            self.reset()
+            return None
+        
+        best = detections[best_index]
+        bbox = np.asarray(best['bbox'], dtype=np.float32)
+        old_center = (self._bbox[:2] + self._bbox[2:]) / 2
+        new_center = (bbox[:2] + bbox[2:]) / 2
+        self._velocity = (new_center - old_center) / elapsed
+        self._bbox = bbox
+        self._face = dict(best)
+        self._frames_since_update = 0
+        return self._face
+    
+    def predict(self) -> Optional[dict]:
+        """
+        Advance the track by one frame without a detection.
+        
+        Shifts the box and keypoints of the last detection by the estimated
+        per-frame velocity.
+        
+        Returns:
+            The predicted face, or None if nothing is tracked
+        """
+        if self._face is None:
+            return None
+        
+        self._frames_since_update += 1
+        shift = self._velocity * self._frames_since_update
+        face = dict(self._face)
+        face['bbox'] = (self._bbox + np.tile(shift, 2)).astype(int)
+        if face.get('kps') is not None:
+            face['kps'] = self._face['kps'] + shift
+        return face
+    
+    def _start(self, face: dict):
+        """Start a new track from a detection."""
+        self._face = dict(face)
+        self._bbox = np.asarray(face['bbox'], dtype=np.float32)
+        self._velocity = np.zeros(2, dtype=np.float32)
+        self._frames_since_update = 0
+
@@ -9,38 +9,120 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# swscale equivalents of the OpenCV interpolations FrameProcessor picks
+_SWSCALE_INTERPOLATION = {
+    cv2.INTER_NEAREST: "POINT",
+    cv2.INTER_AREA: "AREA",
+    cv2.INTER_LINEAR: "BILINEAR",
+}
+
+
+def log_opencv_acceleration():
+    """
+    Make sure OpenCV's optimized code paths are on and log what is active.
+    
+    resize/cvtColor/blobFromImage use Intel IPP and runtime-dispatched SIMD
+    kernels when available; the log line makes it easy to confirm a given
+    image/host actually gets them (e.g. AVX2/AVX512 vs. baseline SSE).
+    """
+    cv2.setUseOptimized(True)
+    ipp = "disabled"
+    if hasattr(cv2, "ipp"):
+        cv2.ipp.setUseIPP(True)
+        if cv2.ipp.useIPP():
+            ipp = cv2.ipp.getIppVersion()
+    logger.info(
+        f"OpenCV {cv2.__version__}: IPP {ipp}; CPU features: {cv2.getCPUFeaturesLine()}"
+    )
+
 
 class FrameProcessor:
     """Handles frame preprocessing and postprocessing."""
     
-    def __init__(self, target_size: Optional[Tuple[int, int]] = None):
+    def __init__(self, target_size: Optional[Tuple[int, int]] = None, fast_preview: bool = False):
         """
         Initialize frame processor.
         
         Args:
             target_size: Optional target size for frames (width, height)
+            fast_preview: Always resize with nearest-neighbour interpolation.
+                Much cheaper, but aliases on downscales and looks blocky on
+                upscales, so only use it for previews/thumbnails.
         """
         self.target_size = target_size
+        self.fast_preview = fast_preview
+        
+        # Per-instance scratch buffers, allocated on first use and reused
+        # across frames so the hot path does not allocate
+        self._color_buf: Optional[np.ndarray] = None
+        self._resize_buf: Optional[np.ndarray] = None
+        self._post_buf: Optional[np.ndarray] = None
+        self._blank = np.zeros((480, 640, 3), dtype=np.uint8)
+    
+    def copy(self) -> "FrameProcessor":
+        """Create a processor with the same settings and its own scratch buffers."""
+        return FrameProcessor(target_size=self.target_size, fast_preview=self.fast_preview)
+    
+    @staticmethod
+    def _reuse_buffer(buf: Optional[np.ndarray], shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """Return buf if it matches shape/dtype, otherwise allocate a new one."""
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+        return buf
+    
+    def _interpolation(self, src_w: int, src_h: int, dst_w: int, dst_h: int) -> int:
+        """
+        Pick the resize interpolation for the given scale.
+        
+        INTER_AREA for downscales (better quality and cheaper for large
+        ratios), INTER_LINEAR for upscales, INTER_NEAREST in fast preview mode.
+        """
+        if self.fast_preview:
+            return cv2.INTER_NEAREST
+        if dst_w * dst_h < src_w * src_h:
+            return cv2.INTER_AREA
+        return cv2.INTER_LINEAR
+    
+    def swscale_interpolation(self, src_w: int, src_h: int, dst_w: int, dst_h: int) -> str:
+        """
+        Same choice as _interpolation, as a PyAV/swscale interpolation name.
+        
+        Used when the resize is folded into the VideoFrame reformat, so both
+        resize paths filter the same way.
+        """
+        return _SWSCALE_INTERPOLATION[self._interpolation(src_w, src_h, dst_w, dst_h)]
     
     def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
         """
         Preprocess frame before face swapping.
         
+        The returned array may be a buffer owned by this processor; it is
+        overwritten by the next call.
+        
         Args:
             frame: Input frame (BGR format)
             
         Returns:
             Preprocessed frame
         """
+        # Ensure frame is in BGR format before resizing so the resize only
+        # ever runs once, on 3-channel data
+        if frame.ndim == 2:
+            self._color_buf = self._reuse_buffer(self._color_buf, frame.shape + (3,), frame.dtype)
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR, dst=self._color_buf)
+        elif frame.shape[2] == 4:
+            self._color_buf = self._reuse_buffer(self._color_buf, frame.shape[:2] + (3,), frame.dtype)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR, dst=self._color_buf)
+        
         # Resize if target size is specified
         if self.target_size:
-            frame = cv2.resize(frame, self.target_size, interpolation=cv2.INTER_LINEAR)
-        
-        # Ensure frame is in BGR format
-        if len(frame.shape) == 2:
-            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-        elif frame.shape[2] == 4:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+            width, height = self.target_size
+            if frame.shape[:2] != (height, width):
+                self._resize_buf = self._reuse_buffer(self._resize_buf, (height, width, 3), frame.dtype)
+                interpolation = self._interpolation(frame.shape[1], frame.shape[0], width, height)
+                frame = cv2.resize(
+                    frame, self.target_size, dst=self._resize_buf, interpolation=interpolation
+                )
         
         return frame
     
@@ -48,6 +130,9 @@ class FrameProcessor:
         """
         Postprocess frame after face swapping.
         
+        The input is never modified. For non-uint8 frames the result is a
+        buffer owned by this processor, overwritten by the next call.
+        
         Args:
             frame: Processed frame (BGR format)
             
@@ -57,12 +142,16 @@ class FrameProcessor:
         # Ensure frame is valid
         if frame is None or frame.size == 0:
             logger.warning("Empty frame received in postprocess")
-            return np.zeros((480, 640, 3), dtype=np.uint8)
+            return self._blank
         
-        # Clip values to valid range
-        frame = np.clip(frame, 0, 255).astype(np.uint8)
+        # The swap engine normally returns uint8 already; nothing to clip
+        if frame.dtype == np.uint8:
+            return frame
         
-        return frame
+        # Clip and cast in one pass, straight into a reused uint8 buffer
+        self._post_buf = self._reuse_buffer(self._post_buf, frame.shape, np.uint8)
+        np.clip(frame, 0, 255, out=self._post_buf, casting='unsafe')
+        return self._post_buf
     
     def rgb_to_bgr(self, frame: np.ndarray) -> np.ndarray:
         """Convert RGB frame to BGR."""
@@ -111,7 +200,8 @@ class FrameProcessor:
         else:
             return frame
         
-        return cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        interpolation = self._interpolation(w, h, new_w, new_h)
+        return cv2.resize(frame, (new_w, new_h), interpolation=interpolation)
     
     def normalize_frame(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -141,14 +231,21 @@ class FrameProcessor:
         """
         Convert frame to tensor format (HWC -> CHW).
         
+        The result is materialized contiguously, so consumers (e.g. a CUDA
+        upload) get a plain linear copy rather than a strided view.
+        
         Args:
             frame: Input frame (H, W, C)
             
         Returns:
-            Tensor format (C, H, W)
+            Tensor format (C, H, W), C-contiguous
         """
         if len(frame.shape) == 3:
-            return np.transpose(frame, (2, 0, 1))
+            if frame.shape[2] == 1:
+                # Single channel (masks, alpha): HWC and CHW share the same
+                # memory layout, so a reshape replaces the permutation
+                return frame.reshape(1, frame.shape[0], frame.shape[1])
+            return np.ascontiguousarray(np.transpose(frame, (2, 0, 1)))
         return frame
     
     def tensor_to_frame(self, tensor: np.ndarray) -> np.ndarray:
@@ -159,9 +256,10 @@ class FrameProcessor:
             tensor: Input tensor (C, H, W)
             
         Returns:
-            Frame format (H, W, C)
+            Frame format (H, W, C), C-contiguous
         """
         if len(tensor.shape) == 3:
-            return np.transpose(tensor, (1, 2, 0))
+            if tensor.shape[0] == 1:
+                return tensor.reshape(tensor.shape[1], tensor.shape[2], 1)
+            return np.ascontiguousarray(np.transpose(tensor, (1, 2, 0)))
         return tensor
-
@@ -8,15 +8,15 @@ import sys
 from contextlib import asynccontextmanager
 from typing import Optional
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
-import torch
 
 from .config import config
 from .swap_engine import SwapEngine
-from .frame_processor import FrameProcessor
+from .frame_processor import FrameProcessor, log_opencv_acceleration
 from .webrtc_server import WebRTCServer
 from .signaling_client import SignalingClient
+from .scheduler import PeriodicScheduler
 
 # Configure logging
 logging.basicConfig(
@@ -30,12 +30,13 @@ swap_engine: Optional[SwapEngine] = None
 frame_processor: Optional[FrameProcessor] = None
 webrtc_server: Optional[WebRTCServer] = None
 signaling_client: Optional[SignalingClient] = None
+scheduler: Optional[PeriodicScheduler] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown."""
-    global swap_engine, frame_processor, webrtc_server, signaling_client
+    global swap_engine, frame_processor, webrtc_server, signaling_client, scheduler
     
     # Startup
     logger.info("Starting GPU Node...")
@@ -46,10 +47,14 @@ async def lifespan(app: FastAPI):
         swap_engine = SwapEngine(
             model_path=config.model_path,
             model_type=config.model_type,
-            gpu_id=config.gpu_id
+            gpu_id=config.gpu_id,
+            use_tensorrt=config.use_tensorrt,
+            precision=config.swapper_precision,
+            det_size=config.detection_size
         )
         
         # Initialize frame processor
+        log_opencv_acceleration()
         frame_processor = FrameProcessor()
         
         # Initialize WebRTC server
@@ -62,7 +67,7 @@ async def lifespan(app: FastAPI):
         # Register node with orchestrator if configured
         if signaling_client.orchestrator_url:
             node_info = {
-                "gpu": torch.cuda.get_device_name(config.gpu_id) if torch.cuda.is_available() else "CPU",
+                "gpu": swap_engine.device_name,
                 "status": "ready",
                 "port": config.port
             }
@@ -71,7 +76,9 @@ async def lifespan(app: FastAPI):
         logger.info("GPU Node started successfully")
         
         # Start background tasks
-        asyncio.create_task(health_reporting_task())
+        scheduler = PeriodicScheduler()
+        scheduler.every(config.health_check_interval, report_health)
+        scheduler.start()
         asyncio.create_task(signaling_polling_task())
         
     except Exception as e:
@@ -83,17 +90,24 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("Shutting down GPU Node...")
     
+    if scheduler:
+        await scheduler.stop()
+    
     if webrtc_server:
         await webrtc_server.close_all()
+        webrtc_server.stop()
     
     if signaling_client:
         await signaling_client.stop()
     
+    if swap_engine:
+        swap_engine.close()
+    
     logger.info("GPU Node shut down")
 
 
 # Create FastAPI app
-app = FastAPI(title="GPU Node", lifespan=lifespan)
+app = FastAPI(title="GPU Node", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 
 @app.get("/health")
@@ -101,14 +115,15 @@ async def health_check():
     """Health check endpoint."""
     try:
         gpu_info = {}
-        if torch.cuda.is_available():
+        if swap_engine:
+            # Device name is cached on the engine; memory comes straight from
+            # the driver (NVML) rather than PyTorch's allocator
+            memory = swap_engine.get_device_memory()
             gpu_info = {
-                "gpu": torch.cuda.get_device_name(config.gpu_id),
-                "memory_used": torch.cuda.memory_allocated(config.gpu_id) / 1024**3,  # GB
-                "memory_total": torch.cuda.get_device_properties(config.gpu_id).total_memory / 1024**3,  # GB
+                "gpu": swap_engine.device_name,
+                "memory_used": memory["used"],  # GB
+                "memory_total": memory["total"],  # GB
             }
-            if swap_engine:
-                gpu_info.update(swap_engine.get_gpu_memory_usage())
         
         active_connections = webrtc_server.get_active_connections() if webrtc_server else 0
         
@@ -125,6 +140,14 @@ async def health_check():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/debug/memory")
+async def debug_memory():
+    """PyTorch caching-allocator statistics (debug only)."""
+    if not swap_engine:
+        raise HTTPException(status_code=503, detail="Swap engine not initialized")
+    return swap_engine.get_gpu_memory_usage()
+
+
 @app.post("/configure")
 async def configure_node(config_data: dict):
     """Configure node settings."""
@@ -161,38 +184,31 @@ async def handle_signaling_offer(offer_data: dict):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def health_reporting_task():
-    """Background task to report health to orchestrator."""
-    while True:
-        try:
-            await asyncio.sleep(config.health_check_interval)
-            
-            if signaling_client and signaling_client.orchestrator_url:
-                health_data = {
-                    "status": "ok",
-                    "gpu_memory": swap_engine.get_gpu_memory_usage() if swap_engine else {},
-                    "active_sessions": webrtc_server.get_active_connections() if webrtc_server else 0
-                }
-                await signaling_client.send_health_update(health_data)
-        except Exception as e:
-            logger.error(f"Health reporting error: {e}")
+async def report_health():
+    """Report health to orchestrator; run periodically by the scheduler."""
+    if signaling_client and signaling_client.orchestrator_url:
+        health_data = {
+            "status": "ok",
+            "gpu_memory": swap_engine.get_gpu_memory_usage() if swap_engine else {},
+            "active_sessions": webrtc_server.get_active_connections() if webrtc_server else 0
+        }
+        await signaling_client.send_health_update(health_data)
 
 
 async def signaling_polling_task():
-    """Background task to poll for signaling messages."""
-    while True:
+    """Background task to receive signaling messages via long-polling."""
+    if not signaling_client:
+        return
+    
+    async for offer in signaling_client.offers():
         try:
-            await asyncio.sleep(1)  # Poll every second
-            
-            if signaling_client:
-                offer = await signaling_client.receive_offer()
-                if offer and webrtc_server:
-                    offer_sdp = offer.get("offer")
-                    session_id = offer.get("session_id")
-                    
-                    if offer_sdp:
-                        answer_sdp = await webrtc_server.handle_offer(offer_sdp)
-                        await signaling_client.send_answer(answer_sdp, session_id)
+            if webrtc_server:
+                offer_sdp = offer.get("offer")
+                session_id = offer.get("session_id")
+                
+                if offer_sdp:
+                    answer_sdp = await webrtc_server.handle_offer(offer_sdp)
+                    await signaling_client.send_answer(answer_sdp, session_id)
         except Exception as e:
             logger.error(f"Signaling polling error: {e}")
 
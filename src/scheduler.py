@@ -0,0 +1,79 @@
+"""
+Periodic job scheduler.
+Runs all recurring background work from a single task that only wakes for the nearest deadline.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[], Awaitable[None]]
+
+
+class PeriodicScheduler:
+    """Runs periodic coroutines from one background task."""
+    
+    def __init__(self):
+        """Initialize an empty scheduler."""
+        # Min-heap of (next_run, sequence, interval, job); the sequence number
+        # keeps ordering stable without ever comparing the job callables
+        self._jobs: List[Tuple[float, int, float, Job]] = []
+        self._sequence = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+    
+    def every(self, interval: float, job: Job):
+        """
+        Run a coroutine function every `interval` seconds.
+        
+        The first run happens one interval from now. Register jobs before
+        calling start(): the running task only ever looks at the job that was
+        due next when it went to sleep.
+        
+        Args:
+            interval: Seconds between runs
+            job: Coroutine function taking no arguments
+        """
+        if self._task is not None:
+            raise RuntimeError("Jobs must be registered before the scheduler is started")
+        next_run = time.monotonic() + interval
+        heapq.heappush(self._jobs, (next_run, next(self._sequence), interval, job))
+    
+    def start(self):
+        """Start the scheduler task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the scheduler task."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        """Sleep until the nearest deadline, run the due job, repeat."""
+        while self._jobs:
+            next_run, sequence, interval, job = self._jobs[0]
+            delay = next_run - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            
+            # Reschedule before running; skip missed runs rather than bursting
+            now = time.monotonic()
+            following = next_run + interval
+            if following < now:
+                following = now + interval
+            heapq.heapreplace(self._jobs, (following, sequence, interval, job))
+            
+            try:
+                await job()
+            except Exception as e:
+                logger.error(f"Scheduled job {getattr(job, '__name__', job)} failed: {e}")
+
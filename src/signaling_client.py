@@ -5,11 +5,14 @@ Receives signaling messages and manages WebRTC handshake.
 import asyncio
 import logging
 import aiohttp
-from typing import Optional, Dict, Any
+import orjson
+from typing import Optional, Dict, Any, AsyncIterator
 from .config import config
 
 logger = logging.getLogger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
 
 class SignalingClient:
     """Client for orchestrator signaling communication."""
@@ -29,7 +32,19 @@ class SignalingClient:
     async def start(self):
         """Start the signaling client."""
         if self.orchestrator_url:
-            self.session = aiohttp.ClientSession()
+            # Small keep-alive pool: a long-poll plus the occasional health
+            # update/answer, without a fresh TCP/TLS handshake per request
+            connector = aiohttp.TCPConnector(
+                limit=8,
+                limit_per_host=4,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True,
+                keepalive_timeout=120
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=5)
+            )
             logger.info(f"Signaling client started, orchestrator: {self.orchestrator_url}")
         else:
             logger.warning("No orchestrator URL configured, signaling disabled")
@@ -56,10 +71,11 @@ class SignalingClient:
         
         try:
             url = f"{self.orchestrator_url}/nodes/register"
-            async with self.session.post(url, json={
+            payload = orjson.dumps({
                 "node_id": self.node_id,
                 **node_info
-            }) as response:
+            })
+            async with self.session.post(url, data=payload, headers=_JSON_HEADERS) as response:
                 if response.status == 200:
                     logger.info("Node registered with orchestrator")
                     return True
@@ -85,16 +101,21 @@ class SignalingClient:
         
         try:
             url = f"{self.orchestrator_url}/nodes/{self.node_id}/health"
-            async with self.session.post(url, json=health_data) as response:
+            payload = orjson.dumps(health_data)
+            async with self.session.post(url, data=payload, headers=_JSON_HEADERS) as response:
                 return response.status == 200
         except Exception as e:
             logger.error(f"Failed to send health update: {e}")
             return False
     
-    async def receive_offer(self) -> Optional[Dict[str, Any]]:
+    async def receive_offer(self, wait: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """
         Poll for incoming SDP offer from orchestrator.
         
+        Args:
+            wait: Seconds the orchestrator may hold the request open until an
+                offer arrives (HTTP long-poll). None returns immediately.
+        
         Returns:
             Offer data or None
         """
@@ -103,15 +124,44 @@ class SignalingClient:
         
         try:
             url = f"{self.orchestrator_url}/nodes/{self.node_id}/offers"
-            async with self.session.get(url) as response:
+            kwargs: Dict[str, Any] = {}
+            if wait:
+                kwargs["params"] = {"wait": wait}
+                kwargs["timeout"] = aiohttp.ClientTimeout(total=wait + 5)
+            async with self.session.get(url, **kwargs) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    body = await response.read()
+                    data = orjson.loads(body) if body.strip() else None
                     return data if data else None
                 return None
+        except asyncio.TimeoutError:
+            return None
         except Exception as e:
             logger.error(f"Failed to receive offer: {e}")
             return None
     
+    async def offers(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield SDP offers from the orchestrator as they arrive.
+        
+        Uses HTTP long-polling, so an offer is delivered as soon as the
+        orchestrator has it instead of on the next poll tick. If a poll comes
+        back empty almost immediately (error, or an orchestrator without
+        long-poll support) the next one is delayed by a second so the loop
+        never spins. Stops when the client is stopped.
+        
+        Yields:
+            Offer data
+        """
+        loop = asyncio.get_running_loop()
+        while self.session and self.orchestrator_url:
+            started = loop.time()
+            offer = await self.receive_offer(wait=config.signaling_long_poll_timeout)
+            if offer:
+                yield offer
+            elif loop.time() - started < 1:
+                await asyncio.sleep(1)
+    
     async def send_answer(self, answer_sdp: str, session_id: str) -> bool:
         """
         Send SDP answer to orchestrator.
@@ -128,10 +178,11 @@ class SignalingClient:
         
         try:
             url = f"{self.orchestrator_url}/nodes/{self.node_id}/answers"
-            async with self.session.post(url, json={
+            payload = orjson.dumps({
                 "session_id": session_id,
                 "answer": answer_sdp
-            }) as response:
+            })
+            async with self.session.post(url, data=payload, headers=_JSON_HEADERS) as response:
                 return response.status == 200
         except Exception as e:
             logger.error(f"Failed to send answer: {e}")
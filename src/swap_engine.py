@@ -7,15 +7,151 @@ import numpy as np
 import torch
 from typing import Optional, Tuple, List
 import logging
+import threading
+import time
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+_TORCH_DTYPES = {
+    np.dtype(np.float32): torch.float32,
+    np.dtype(np.float16): torch.float16,
+}
+
+
+class _IOBoundSession:
+    """
+    ONNX Runtime session wrapper that runs through IOBinding with reusable buffers.
+    
+    Drop-in replacement for the swapper's session.run(): inputs are staged in
+    pinned host buffers, copied to preallocated device buffers on a side
+    stream and bound in place, and outputs are written to preallocated device
+    buffers and read back into pinned memory. No per-frame cudaMalloc /
+    cudaFree or pageable copies. Buffers are per thread, so concurrent callers
+    never share them; arrays returned by run() stay valid until the same
+    thread's next call. Everything else is delegated to the wrapped session.
+    
+    If the session was created with the CUDA stream passed as `stream`
+    (user_compute_stream), the copies are queued on that stream too, so they
+    are ordered with the model's kernels without a host-side wait.
+    """
+    
+    _ORT_DTYPES = {
+        'tensor(float)': np.dtype(np.float32),
+        'tensor(float16)': np.dtype(np.float16),
+    }
+    
+    def __init__(self, session, device: torch.device, stream: Optional[torch.cuda.Stream] = None):
+        """
+        Wrap an ONNX Runtime session.
+        
+        Args:
+            session: ONNX Runtime InferenceSession using a CUDA provider
+            device: CUDA device the session runs on
+            stream: The session's user compute stream, if it has one
+        """
+        self._session = session
+        self._device = device
+        self._stream = stream
+        self._outputs = {
+            o.name: (tuple(o.shape), self._ORT_DTYPES[o.type])
+            for o in session.get_outputs()
+        }
+        self._local = threading.local()
+    
+    @classmethod
+    def supports(cls, session) -> bool:
+        """Whether the session runs on CUDA with statically shaped float outputs."""
+        providers = session.get_providers()
+        if 'CUDAExecutionProvider' not in providers and 'TensorrtExecutionProvider' not in providers:
+            return False
+        return all(
+            o.type in cls._ORT_DTYPES and all(isinstance(d, int) for d in o.shape)
+            for o in session.get_outputs()
+        )
+    
+    def __getattr__(self, name):
+        """Delegate everything else to the wrapped session."""
+        return getattr(self._session, name)
+    
+    def _state(self) -> threading.local:
+        """Per-thread binding, stream and buffers."""
+        state = self._local
+        if not hasattr(state, 'binding'):
+            state.binding = self._session.io_binding()
+            state.stream = self._stream or torch.cuda.Stream(self._device)
+            state.buffers = {}  # name -> (pinned host tensor, device tensor)
+        return state
+    
+    def _buffers(self, state, name: str, shape: Tuple[int, ...], dtype: np.dtype):
+        """Return (host, device) buffers for a tensor, allocating on shape change."""
+        torch_dtype = _TORCH_DTYPES[dtype]
+        pair = state.buffers.get(name)
+        if pair is None or tuple(pair[0].shape) != tuple(shape) or pair[0].dtype != torch_dtype:
+            host = torch.empty(shape, dtype=torch_dtype, pin_memory=True)
+            pair = (host, torch.empty_like(host, device=self._device))
+            state.buffers[name] = pair
+        return pair
+    
+    def _bind_kwargs(self, tensor: torch.Tensor, dtype: np.dtype) -> dict:
+        """IOBinding arguments describing a device tensor."""
+        return {
+            'device_type': 'cuda',
+            'device_id': self._device.index or 0,
+            'element_type': dtype.type,
+            'shape': tuple(tensor.shape),
+            'buffer_ptr': tensor.data_ptr(),
+        }
+    
+    @torch.inference_mode()
+    def run(self, output_names, input_feed, run_options=None):
+        """Same contract as InferenceSession.run(), backed by IOBinding."""
+        state = self._state()
+        binding = state.binding
+        
+        # Stage inputs: pinned host -> device on the side stream
+        with torch.cuda.stream(state.stream):
+            for name, array in input_feed.items():
+                array = np.asarray(array)
+                host, dev = self._buffers(state, name, array.shape, array.dtype)
+                host.numpy()[...] = array
+                dev.copy_(host, non_blocking=True)
+                binding.bind_input(name, **self._bind_kwargs(dev, array.dtype))
+        if self._stream is None:
+            # ORT runs on its own stream; the inputs must have landed first
+            state.stream.synchronize()
+        
+        names = output_names or list(self._outputs)
+        pairs = []
+        for name in names:
+            shape, dtype = self._outputs[name]
+            host, dev = self._buffers(state, name, shape, dtype)
+            binding.bind_output(name, **self._bind_kwargs(dev, dtype))
+            pairs.append((host, dev))
+        
+        self._session.run_with_iobinding(binding, run_options)
+        
+        results = []
+        with torch.cuda.stream(state.stream):
+            for host, dev in pairs:
+                host.copy_(dev)
+                results.append(host.numpy())
+        binding.clear_binding_outputs()
+        return results
+
 
 class SwapEngine:
     """Core face-swapping engine using GPU acceleration."""
     
-    def __init__(self, model_path: str, model_type: str = "insightface", gpu_id: int = 0):
+    def __init__(
+        self,
+        model_path: str,
+        model_type: str = "insightface",
+        gpu_id: int = 0,
+        use_tensorrt: bool = False,
+        precision: str = "fp32",
+        det_size: Tuple[int, int] = (320, 240)
+    ):
         """
         Initialize the swap engine.
         
@@ -23,13 +159,59 @@ class SwapEngine:
             model_path: Path to model directory
             model_type: Type of model ('insightface' or 'deepfacelive')
             gpu_id: GPU device ID
+            use_tensorrt: Run the swapper through ONNX Runtime's TensorRT
+                execution provider, caching built engines in the model dir
+            precision: Swapper precision on GPU ('fp32', 'fp16' or 'int8';
+                int8 needs TensorRT and a calibration table)
+            det_size: Detector input resolution (width, height). Frames are
+                detected at this size and boxes mapped back, so detector cost
+                does not grow with the camera resolution.
         """
         self.model_path = Path(model_path)
         self.model_type = model_type
+        self.gpu_id = gpu_id
+        self.use_tensorrt = use_tensorrt
+        if precision == "int8" and not use_tensorrt:
+            logger.warning("int8 swapper precision requires TensorRT, using fp16")
+            precision = "fp16"
+        self.precision = precision
+        self.det_size = det_size
         self.device = torch.device(f"cuda:{gpu_id}" if torch.cuda.is_available() else "cpu")
         self.model = None
         self.face_analyzer = None
+        self.face_detector = None
         self.swapper = None
+        self._swapper_batching = False  # swapper accepts batch > 1
+        
+        # Haar cascade fallback and its grayscale scratch buffer, created on
+        # first use rather than per frame
+        self._haar: Optional[cv2.CascadeClassifier] = None
+        self._gray_buf: Optional[np.ndarray] = None
+        self._det_buf: Optional[np.ndarray] = None
+        # The OpenCV fallback detectors and their scratch buffers are not
+        # safe to share between inference threads
+        self._fallback_lock = threading.Lock()
+        
+        # Immutable device properties, queried once instead of per health poll
+        if torch.cuda.is_available():
+            self.device_name = torch.cuda.get_device_name(gpu_id)
+            self.total_memory_gb = torch.cuda.get_device_properties(gpu_id).total_memory / 1024**3
+        else:
+            self.device_name = "CPU"
+            self.total_memory_gb = 0.0
+        
+        # Dedicated stream for the swapper session. ORT gives the detector
+        # sessions their own streams, so detection for one frame can run on
+        # the GPU while another frame is in the generator
+        self._swap_stream: Optional[torch.cuda.Stream] = None
+        if torch.cuda.is_available():
+            self._swap_stream = torch.cuda.Stream(self.device)
+        
+        # NVML handle for cheap driver-level memory queries on the health path
+        self._nvml = None
+        self._nvml_handle = None
+        if torch.cuda.is_available():
+            self._init_nvml(gpu_id)
         
         logger.info(f"Initializing SwapEngine on device: {self.device}")
         self._load_model()
@@ -60,24 +242,116 @@ class SwapEngine:
                 root=str(self.model_path),
                 providers=['CUDAExecutionProvider', 'CPUExecutionProvider']
             )
-            self.face_analyzer.prepare(ctx_id=0 if self.device.type == 'cuda' else -1, det_size=(640, 640))
+            # The detector letterboxes each frame into det_size itself; its
+            # strides need both sides to be multiples of 32
+            det_size = tuple(-(-side // 32) * 32 for side in self.det_size)
+            self.face_analyzer.prepare(ctx_id=0 if self.device.type == 'cuda' else -1, det_size=det_size)
             
-            # Load face swapper
+            # Load face swapper; the execution providers select the device
             self.swapper = insightface.model_zoo.get_model(
-                str(self.model_path / "inswapper_128.onnx"),
+                str(self._swapper_model_file()),
                 download=False,
-                download_zip=False
+                download_zip=False,
+                providers=self._swapper_providers()
             )
             
-            if self.device.type == 'cuda':
-                # Move to GPU if available
-                self.swapper.prepare(ctx_id=0)
+            self._swapper_batching = not isinstance(self.swapper.session.get_inputs()[0].shape[0], int)
+            
+            # Reuse pinned host + device I/O buffers across frames
+            if self.device.type == 'cuda' and _IOBoundSession.supports(self.swapper.session):
+                self.swapper.session = _IOBoundSession(
+                    self.swapper.session, self.device, stream=self._swap_stream
+                )
             
             logger.info("InsightFace model loaded")
         except ImportError:
             logger.warning("InsightFace not available, using fallback")
             self._load_fallback()
     
+    def _swapper_model_file(self) -> Path:
+        """
+        Path of the swapper ONNX model for the configured precision.
+        
+        For fp16 the fp32 model is converted once (float16 weights and
+        activations, float32 inputs/outputs kept) and cached next to it, which
+        halves weight bandwidth and lets the CUDA EP use Tensor Cores. Falls
+        back to fp32 on CPU or if the conversion tools are unavailable.
+        TensorRT always gets the fp32 graph; it picks reduced-precision
+        kernels itself from the builder flags set in _swapper_providers.
+        """
+        fp32_path = self.model_path / "inswapper_128.onnx"
+        if self.precision != "fp16" or self.device.type != 'cuda' or self.use_tensorrt:
+            return fp32_path
+        
+        fp16_path = self.model_path / "inswapper_128_fp16.onnx"
+        if fp16_path.exists():
+            return fp16_path
+        
+        try:
+            import onnx
+            from onnxconverter_common import float16
+            
+            logger.info("Converting swapper model to fp16")
+            model = float16.convert_float_to_float16(onnx.load(str(fp32_path)), keep_io_types=True)
+            onnx.save(model, str(fp16_path))
+            return fp16_path
+        except ImportError:
+            logger.warning("onnxconverter-common not installed, using fp32 swapper")
+        except Exception as e:
+            logger.warning(f"fp16 conversion failed, using fp32 swapper: {e}")
+        return fp32_path
+    
+    def _swapper_providers(self) -> list:
+        """
+        ONNX Runtime execution providers for the swapper session.
+        
+        With TensorRT enabled the graph is compiled into fused kernels, which
+        removes most of the per-node launch overhead on the 128x128 input.
+        The built engine is cached under the model directory so it is only
+        built on the first start. ORT falls back to the next provider if
+        TensorRT is unavailable.
+        
+        fp16 lets TensorRT use Tensor Core kernels. int8 additionally needs
+        a calibration table (trt_cache/inswapper_128_calibration.flatbuffers,
+        produced offline from representative face crops); without one the
+        engine is built in fp16. Only the swapper is affected; the detector
+        and recognition models stay fp32.
+        """
+        if self.device.type != 'cuda':
+            return ['CPUExecutionProvider']
+        
+        # Run the swapper's kernels on the engine's own stream
+        stream = str(self._swap_stream.cuda_stream)
+        
+        providers = []
+        if self.use_tensorrt:
+            cache_dir = self.model_path / "trt_cache"
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            trt_options = {
+                'device_id': self.gpu_id,
+                'trt_engine_cache_enable': True,
+                'trt_engine_cache_path': str(cache_dir),
+                'trt_fp16_enable': self.precision in ("fp16", "int8"),
+                'user_compute_stream': stream,
+            }
+            if self.precision == "int8":
+                calibration_table = cache_dir / "inswapper_128_calibration.flatbuffers"
+                if calibration_table.exists():
+                    trt_options['trt_int8_enable'] = True
+                    trt_options['trt_int8_calibration_table_name'] = calibration_table.name
+                else:
+                    logger.warning(f"No int8 calibration table at {calibration_table}, building fp16 engine")
+            providers.append(('TensorrtExecutionProvider', trt_options))
+        providers.append(('CUDAExecutionProvider', {
+            'device_id': self.gpu_id,
+            # Input shapes never change, so the exhaustive search runs once
+            # (during warmup) and its result is reused for every frame
+            'cudnn_conv_algo_search': 'EXHAUSTIVE',
+            'user_compute_stream': stream,
+        }))
+        providers.append('CPUExecutionProvider')
+        return providers
+    
     def _load_deepfacelive(self):
         """Load DeepFaceLive model."""
         try:
@@ -107,23 +381,47 @@ class SwapEngine:
         else:
             logger.warning("Fallback model files not found, face detection may be limited")
             self.face_detector = None
+            self._ensure_haar()
     
-    def detect_faces(self, frame: np.ndarray) -> List[dict]:
+    def _ensure_haar(self) -> cv2.CascadeClassifier:
+        """Load the Haar cascade face detector once and return it."""
+        if self._haar is None:
+            self._haar = cv2.CascadeClassifier(
+                cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+            )
+        return self._haar
+    
+    def detect_faces(self, frame: np.ndarray, with_embedding: bool = True) -> List[dict]:
         """
         Detect faces in a frame.
         
         Args:
             frame: Input frame as numpy array (BGR format)
+            with_embedding: Also run InsightFace's recognition and landmark
+                models. Swap targets only need the box and keypoints, so
+                skipping them saves several network passes per frame.
             
         Returns:
             List of face dictionaries with bounding boxes and landmarks
         """
-        if self.face_analyzer is not None:
+        if self.face_analyzer is not None and not with_embedding:
+            # Detector only: boxes, scores and the 5-point keypoints
+            bboxes, kpss = self.face_analyzer.det_model.detect(frame, max_num=0, metric='default')
+            return [
+                {
+                    'bbox': bboxes[i, :4].astype(int),
+                    'kps': kpss[i] if kpss is not None else None,
+                    'det_score': bboxes[i, 4]
+                }
+                for i in range(bboxes.shape[0])
+            ]
+        elif self.face_analyzer is not None:
             # Use InsightFace analyzer
             faces = self.face_analyzer.get(frame)
             return [
                 {
                     'bbox': face.bbox.astype(int),
+                    'kps': face.kps,
                     'landmark': face.landmark_2d_106,
                     'embedding': face.embedding,
                     'det_score': face.det_score
@@ -137,8 +435,9 @@ class SwapEngine:
                 cv2.resize(frame, (300, 300)), 1.0,
                 (300, 300), [104, 117, 123]
             )
-            self.face_detector.setInput(blob)
-            detections = self.face_detector.forward()
+            with self._fallback_lock:
+                self.face_detector.setInput(blob)
+                detections = self.face_detector.forward()
             
             faces = []
             for i in range(detections.shape[2]):
@@ -151,19 +450,63 @@ class SwapEngine:
                     })
             return faces
         else:
-            # Basic fallback using OpenCV Haar cascades
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-            faces_detected = face_cascade.detectMultiScale(gray, 1.1, 4)
+            # Basic fallback using OpenCV Haar cascades, run on a copy
+            # downscaled to fit det_size; boxes are scaled back below
+            h, w = frame.shape[:2]
+            scale = min(self.det_size[0] / w, self.det_size[1] / h, 1.0)
+            dw, dh = round(w * scale), round(h * scale)
+            with self._fallback_lock:
+                small = frame
+                if (dw, dh) != (w, h):
+                    if self._det_buf is None or self._det_buf.shape != (dh, dw, 3):
+                        self._det_buf = np.empty((dh, dw, 3), dtype=np.uint8)
+                    small = cv2.resize(frame, (dw, dh), dst=self._det_buf, interpolation=cv2.INTER_LINEAR)
+                if self._gray_buf is None or self._gray_buf.shape != (dh, dw):
+                    self._gray_buf = np.empty((dh, dw), dtype=np.uint8)
+                gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._gray_buf)
+                faces_detected = self._ensure_haar().detectMultiScale(gray, 1.1, 4)
             
             return [
                 {
-                    'bbox': np.array([x, y, x+w, y+h]),
+                    'bbox': (np.array([x, y, x+w, y+h]) / scale).astype(int),
                     'det_score': 1.0
                 }
                 for (x, y, w, h) in faces_detected
             ]
     
+    def compute_embedding(self, frame: np.ndarray, face: dict) -> Optional[np.ndarray]:
+        """
+        Compute the swapper's identity latent for a source face.
+        
+        The latent only depends on the source face, so callers that swap the
+        same identity into many frames compute it once and pass it to
+        swap_face_fast instead of redoing it per frame.
+        
+        Args:
+            frame: Frame the face was detected in (BGR format)
+            face: Face dictionary from detect_faces
+            
+        Returns:
+            Latent of shape (1, 512), float32, or None if no swapper or
+            recognition model is loaded
+        """
+        if self.swapper is None:
+            return None
+        
+        embedding = face.get('embedding')
+        if embedding is None:
+            if self.face_analyzer is None or face.get('kps') is None:
+                return None
+            embedding = self.face_analyzer.models['recognition'].get(
+                frame, self._as_insightface_face(face)
+            )
+        
+        # Same projection INSwapper.get applies to source_face.normed_embedding
+        latent = (embedding / np.linalg.norm(embedding)).reshape((1, -1))
+        latent = np.dot(latent, self.swapper.emap)
+        latent /= np.linalg.norm(latent)
+        return latent.astype(np.float32)
+    
     def swap_face(
         self,
         source_frame: np.ndarray,
@@ -194,24 +537,224 @@ class SwapEngine:
                 return target_frame
             source_face = source_faces[0]
         
+        source_embedding = self.compute_embedding(source_frame, source_face)
+        if source_embedding is None:
+            # Fallback: simple overlay (not a real swap, just for testing)
+            logger.warning("Using fallback swap method")
+            if target_face is None:
+                target_faces = self.detect_faces(target_frame, with_embedding=False)
+                if not target_faces:
+                    return target_frame
+                target_face = target_faces[0]
+            return self._fallback_swap(source_frame, target_frame, source_face, target_face)
+        
+        try:
+            return self.swap_face_fast(target_frame, source_embedding, target_face)
+        except Exception as e:
+            logger.error("Face swap failed: %s", e)
+            return target_frame
+    
+    def swap_face_fast(
+        self,
+        target_frame: np.ndarray,
+        source_embedding: np.ndarray,
+        target_face: Optional[dict] = None
+    ) -> np.ndarray:
+        """
+        Swap a precomputed source identity into a frame.
+        
+        Per-frame work is limited to detecting the target face (detector
+        only), the generator pass and the blend. Swap errors are raised, so
+        the per-frame caller can rate-limit how they are logged.
+        
+        Args:
+            target_frame: Frame containing the face to swap TO
+            source_embedding: Latent from compute_embedding
+            target_face: Optional pre-detected target face
+            
+        Returns:
+            Swapped frame
+        """
+        if self.swapper is None:
+            return target_frame
+        
         if target_face is None:
-            target_faces = self.detect_faces(target_frame)
+            target_faces = self.detect_faces(target_frame, with_embedding=False)
             if not target_faces:
                 return target_frame
             target_face = target_faces[0]
         
+        bgr_fake, M = self._generate(source_embedding, target_frame, target_face)
+        return self._paste_back(target_frame, bgr_fake, M)
+    
+    def swap_batch(self, items: List[Tuple[np.ndarray, np.ndarray, dict]]) -> List[np.ndarray]:
+        """
+        Swap precomputed source identities into several frames.
+        
+        Batched counterpart of swap_face_fast for requests collected from
+        several sessions; the generator passes run back to back (or as one
+        run, see _generate_batch), then each face is blended into its frame.
+        Errors are raised, as in swap_face_fast.
+        
+        Args:
+            items: (target_frame, source_embedding, target_face) triples
+            
+        Returns:
+            Swapped frames, in the order of items
+        """
+        frames = [frame for frame, _, _ in items]
+        if self.swapper is None or not items:
+            return frames
+        
+        generated = self._generate_batch(items)
+        return [
+            self._paste_back(frame, bgr_fake, M)
+            for frame, (bgr_fake, M) in zip(frames, generated)
+        ]
+    
+    @staticmethod
+    def _as_insightface_face(face: dict):
+        """Wrap a face dictionary in InsightFace's Face type expected by the swapper."""
+        from insightface.app.common import Face
+        return Face(face)
+    
+    def _generate(
+        self,
+        source_embedding: np.ndarray,
+        target_frame: np.ndarray,
+        target_face: dict
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Run the swap generator for one face, without blending it back.
+        
+        Equivalent to INSwapper.get(..., paste_back=False), but takes the
+        source latent directly instead of recomputing it from a Face.
+        
+        Returns:
+            Swapped 128x128 face crop (BGR) and the affine transform that
+            maps the frame onto that crop
+        """
+        return self._generate_batch([(target_frame, source_embedding, target_face)])[0]
+    
+    def _generate_batch(
+        self,
+        items: List[Tuple[np.ndarray, np.ndarray, dict]]
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Run the swap generator for several faces.
+        
+        If the swapper model has a dynamic batch dimension all crops go
+        through one session run; the stock inswapper model is fixed to
+        batch 1, so it is run once per face.
+        
+        Args:
+            items: (target_frame, source_embedding, target_face) triples
+            
+        Returns:
+            (bgr_fake, M) per item, as returned by _generate
+        """
+        from insightface.utils import face_align
+        
+        swapper = self.swapper
+        aligned = [
+            face_align.norm_crop2(frame, face['kps'], swapper.input_size[0])
+            for frame, _, face in items
+        ]
+        step = len(items) if self._swapper_batching else 1
+        results = []
+        for i in range(0, len(items), step):
+            blob = cv2.dnn.blobFromImages(
+                [aimg for aimg, _ in aligned[i:i + step]], 1.0 / swapper.input_std, swapper.input_size,
+                (swapper.input_mean, swapper.input_mean, swapper.input_mean), swapRB=True
+            )
+            latent = np.concatenate([embedding for _, embedding, _ in items[i:i + step]])
+            pred = swapper.session.run(
+                swapper.output_names,
+                {swapper.input_names[0]: blob, swapper.input_names[1]: latent}
+            )[0]
+            # Convert before the next run: the session may reuse pred's memory
+            for j, img_fake in enumerate(pred.transpose((0, 2, 3, 1))):
+                bgr_fake = np.clip(255 * img_fake, 0, 255).astype(np.uint8)[:, :, ::-1]
+                results.append((bgr_fake, aligned[i + j][1]))
+        return results
+    
+    @staticmethod
+    def _paste_back(frame: np.ndarray, bgr_fake: np.ndarray, M: np.ndarray) -> np.ndarray:
+        """
+        Blend a swapped face crop back into the frame.
+        
+        Same soft-mask blend as InsightFace's INSwapper: the crop is warped
+        back into frame coordinates and merged through an eroded, blurred mask.
+        
+        Args:
+            frame: Frame to paste into (BGR)
+            bgr_fake: Swapped face crop (BGR)
+            M: Affine transform from frame to crop coordinates
+            
+        Returns:
+            New frame with the face blended in
+        """
+        h, w = frame.shape[:2]
+        IM = cv2.invertAffineTransform(M)
+        white = np.full(bgr_fake.shape[:2], 255, dtype=np.float32)
+        bgr_fake = cv2.warpAffine(bgr_fake, IM, (w, h), borderValue=0.0)
+        mask = cv2.warpAffine(white, IM, (w, h), borderValue=0.0)
+        mask[mask > 20] = 255
+        
+        mask_ys, mask_xs = np.where(mask == 255)
+        if mask_ys.size == 0:
+            return frame
+        mask_size = int(np.sqrt((mask_ys.max() - mask_ys.min()) * (mask_xs.max() - mask_xs.min())))
+        k = max(mask_size // 10, 10)
+        mask = cv2.erode(mask, np.ones((k, k), np.uint8), iterations=1)
+        k = max(mask_size // 20, 5)
+        mask = cv2.GaussianBlur(mask, (2 * k + 1, 2 * k + 1), 0)
+        
+        mask = (mask / 255.0)[:, :, np.newaxis]
+        merged = mask * bgr_fake + (1 - mask) * frame.astype(np.float32)
+        return merged.astype(np.uint8)
+    
+    def warmup(self, frame_size: Tuple[int, int] = (640, 480)):
+        """
+        Run every model once on a synthetic frame.
+        
+        The first inference of each ONNX Runtime session pays for cuDNN
+        algorithm selection, TensorRT engine deserialization and buffer
+        allocation. Doing it at startup keeps that stall off the first
+        frames of the first session. Call it from the thread that will run
+        inference, since IOBinding buffers are per thread.
+        
+        Args:
+            frame_size: Size (width, height) of the synthetic frame
+        """
+        if self.face_analyzer is None:
+            return
+        
+        from insightface.utils import face_align
+        
+        start = time.perf_counter()
+        width, height = frame_size
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
         try:
-            # Perform swap using InsightFace
-            if self.swapper is not None and hasattr(self.swapper, 'get'):
-                result = self.swapper.get(target_frame, target_face, source_frame, source_face)
-                return result
-            else:
-                # Fallback: simple overlay (not a real swap, just for testing)
-                logger.warning("Using fallback swap method")
-                return self._fallback_swap(source_frame, target_frame, source_face, target_face)
+            self.detect_faces(frame, with_embedding=False)
+            if self.swapper is not None:
+                # A face template centred in the frame drives the recognition
+                # model and the generator without needing a real face
+                kps = face_align.arcface_dst + np.array([width / 2 - 56, height / 2 - 56], dtype=np.float32)
+                face = {'kps': kps}
+                latent = self.compute_embedding(frame, face)
+                self._generate(latent, frame, face)
         except Exception as e:
-            logger.error(f"Face swap failed: {e}")
-            return target_frame
+            logger.warning(f"Model warm-up failed: {e}")
+            return
+        logger.info(f"Models warmed up in {time.perf_counter() - start:.2f}s")
+    
+    def close(self):
+        """Release NVML."""
+        if self._nvml is not None:
+            self._nvml.nvmlShutdown()
+            self._nvml = None
+            self._nvml_handle = None
     
     def _fallback_swap(
         self,
@@ -224,13 +767,49 @@ class SwapEngine:
         # This is a placeholder - real implementation would use proper face swapping
         return target_frame
     
+    def _init_nvml(self, gpu_id: int):
+        """Initialize NVML for the GPU, if the bindings are installed."""
+        try:
+            import pynvml
+            
+            pynvml.nvmlInit()
+            self._nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(gpu_id)
+            self._nvml = pynvml
+        except ImportError:
+            logger.info("pynvml not available, GPU memory reported from PyTorch")
+        except Exception as e:
+            logger.warning(f"NVML initialization failed: {e}")
+    
+    def get_device_memory(self) -> dict:
+        """
+        Get device memory in use, as cheaply as possible.
+        
+        Queries the driver through NVML (device-wide usage), which avoids
+        PyTorch's allocator locks shared with the inference path. Without
+        NVML, falls back to memory allocated by PyTorch.
+        
+        Returns:
+            Dictionary with 'used' and 'total' in GB
+        """
+        if self._nvml_handle is not None:
+            info = self._nvml.nvmlDeviceGetMemoryInfo(self._nvml_handle)
+            return {'used': info.used / 1024**3, 'total': info.total / 1024**3}
+        if torch.cuda.is_available():
+            return {'used': torch.cuda.memory_allocated(self.device) / 1024**3, 'total': self.total_memory_gb}
+        return {'used': 0, 'total': 0}
+    
     def get_gpu_memory_usage(self) -> dict:
         """Get current GPU memory usage."""
+        usage = {
+            'device_name': self.device_name,
+            'total': self.total_memory_gb,  # GB
+        }
         if torch.cuda.is_available():
-            return {
+            usage.update({
                 'allocated': torch.cuda.memory_allocated(self.device) / 1024**3,  # GB
                 'reserved': torch.cuda.memory_reserved(self.device) / 1024**3,  # GB
                 'max_allocated': torch.cuda.max_memory_allocated(self.device) / 1024**3  # GB
-            }
-        return {'allocated': 0, 'reserved': 0, 'max_allocated': 0}
-
+            })
+        else:
+            usage.update({'allocated': 0, 'reserved': 0, 'max_allocated': 0})
+        return usage
@@ -4,23 +4,84 @@ Receives video from frontend, processes frames, and sends back processed video.
 """
 import asyncio
 import logging
-from typing import Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+import cv2
 import numpy as np
 from av import VideoFrame
+from av.video.reformatter import VideoReformatter
 from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
 from aiortc.contrib.media import MediaPlayer, MediaRelay
 
 from .swap_engine import SwapEngine
 from .frame_processor import FrameProcessor
+from .face_tracker import IOUTracker
+from .batcher import AsyncBatcher
 from .config import config
 
 logger = logging.getLogger(__name__)
 
+# Pixel format the swap pipeline works in
+BGR_FORMAT = "bgr24"
+
+# Format WebRTC decoders deliver and encoders consume
+YUV_FORMAT = "yuv420p"
+
+# Fraction of the face box added on each side of the region converted on
+# the YUV fast path; covers the aligned crop the swapper pastes back
+ROI_MARGIN = 0.5
+
+# Minimum seconds between two per-frame error logs of one track
+ERROR_LOG_INTERVAL = 5.0
+
+
+def _plane_view(frame: VideoFrame, index: int, row_bytes: int, rows: int) -> np.ndarray:
+    """
+    View one plane of a frame as a (rows, row_bytes) uint8 array.
+    
+    Rows padded past row_bytes are skipped through the view's strides, so
+    nothing is copied. The view shares the frame's memory and keeps the
+    frame alive through its buffer.
+    """
+    plane = frame.planes[index]
+    data = np.frombuffer(plane, dtype=np.uint8)[:rows * plane.line_size]
+    return data.reshape(rows, plane.line_size)[:, :row_bytes]
+
+
+def _frame_to_view(frame: VideoFrame, channels: int = 3) -> np.ndarray:
+    """
+    View the pixels of a packed single-plane frame (e.g. bgr24) as (H, W, C).
+    
+    Unlike to_ndarray this never copies; see _plane_view.
+    """
+    width, height = frame.width, frame.height
+    return _plane_view(frame, 0, width * channels, height).reshape(height, width, channels)
+
+
+def _yuv420_views(frame: VideoFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """View the Y, U and V planes of a yuv420p frame."""
+    width, height = frame.width, frame.height
+    chroma_w, chroma_h = (width + 1) // 2, (height + 1) // 2
+    return (
+        _plane_view(frame, 0, width, height),
+        _plane_view(frame, 1, chroma_w, chroma_h),
+        _plane_view(frame, 2, chroma_w, chroma_h),
+    )
+
 
 class ProcessedVideoTrack(VideoStreamTrack):
     """Video track that processes frames through the swap engine."""
     
-    def __init__(self, swap_engine: SwapEngine, frame_processor: FrameProcessor, source_track: VideoStreamTrack):
+    def __init__(
+        self,
+        swap_engine: SwapEngine,
+        frame_processor: FrameProcessor,
+        source_track: VideoStreamTrack,
+        infer_pool: ThreadPoolExecutor,
+        batcher: Optional[AsyncBatcher] = None
+    ):
         """
         Initialize processed video track.
         
@@ -28,60 +89,344 @@ class ProcessedVideoTrack(VideoStreamTrack):
             swap_engine: Swap engine instance
             frame_processor: Frame processor instance
             source_track: Source video track to process
+            infer_pool: Executor that runs the per-frame processing
+            batcher: Optional batcher that swaps frames of several tracks
+                together; without it each frame is swapped on its own
         """
         super().__init__()
         self.swap_engine = swap_engine
-        self.frame_processor = frame_processor
+        self.infer_pool = infer_pool
+        self.batcher = batcher
+        # Own copy: preprocess returns scratch buffers that must not be
+        # overwritten by another track while a swap is in flight
+        self.frame_processor = frame_processor.copy()
         self.source_track = source_track
         self.source_face = None  # Will be set from first frame
+        self._source_embedding: Optional[np.ndarray] = None
+        # The detector runs every config.detect_interval frames (or as soon
+        # as the face is lost); the tracker fills in the frames between
+        self._tracker = IOUTracker()
+        self._frames_since_detect = 0
+        # Prediction already made for the current frame by the YUV fast path
+        # when it fell back to the full-frame path
+        self._predicted: Optional[dict] = None
         self.frame_count = 0
+        self.dropped_frames = 0
+        self._last_error_log = 0.0
+        self._suppressed_errors = 0
+        # Latest-wins single slot between the capture task and recv; frames
+        # that arrive while one is being processed replace the waiting one
+        self._frames: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._capture_task: Optional[asyncio.Task] = None
+        # One reformatter per track keeps the swscale context alive across
+        # frames instead of rebuilding it for every frame
+        self._reformatter = VideoReformatter()
+        # Output frame reused for every frame, plus a numpy view of its
+        # pixels. The sender encodes each frame before asking for the next,
+        # so overwriting it on the following recv is safe
+        self._out_frame: Optional[VideoFrame] = None
+        self._out_view: Optional[np.ndarray] = None
+        # Same for the YUV fast path: a reused yuv420p output frame with its
+        # plane views, and the I420 / BGR scratch buffers for the face region
+        self._yuv_frame: Optional[VideoFrame] = None
+        self._yuv_views: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._roi_i420: Optional[np.ndarray] = None
+        self._roi_bgr: Optional[np.ndarray] = None
+        
+        # Bound methods and settings used per frame, resolved once here
+        # rather than through attribute chains on every call
+        self._reformat = self._reformatter.reformat
+        self._preprocess = self.frame_processor.preprocess_frame
+        self._postprocess = self.frame_processor.postprocess_frame
+        self._detect = swap_engine.detect_faces
+        self._swap = swap_engine.swap_face_fast
+        self._detect_interval = config.detect_interval
+    
+    async def _capture_loop(self):
+        """Pull frames from the source track, keeping only the newest one."""
+        while True:
+            try:
+                frame = await self.source_track.recv()
+            except Exception as e:
+                # Hand the error (e.g. MediaStreamError at end of stream) to
+                # recv so it surfaces to the sender as usual
+                frame = e
+            try:
+                self._frames.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._frames.get_nowait()
+                self._frames.put_nowait(frame)
+                self.dropped_frames += 1
+            if isinstance(frame, Exception):
+                return
     
     async def recv(self):
         """Receive and process frame."""
-        frame = await self.source_track.recv()
+        if self._capture_task is None:
+            self._capture_task = asyncio.create_task(self._capture_loop())
+        frame = await self._frames.get()
+        if isinstance(frame, Exception):
+            raise frame
         
-        # Convert VideoFrame to numpy array
-        img = frame.to_ndarray(format="bgr24")
+        loop = asyncio.get_running_loop()
+        if self._roi_eligible(frame):
+            new_frame = await loop.run_in_executor(self.infer_pool, self._process_roi_sync, frame)
+            if new_frame is not None:
+                return self._finish(frame, new_frame)
         
-        # Preprocess frame
-        img = self.frame_processor.preprocess_frame(img)
+        # Convert VideoFrame to numpy array. When a target size is set,
+        # swscale scales while converting from YUV, so the BGR frame is
+        # written once at its final size and preprocess skips its resize
+        width, height = self.frame_processor.target_size or (None, None)
+        interpolation = None
+        if width is not None:
+            interpolation = self.frame_processor.swscale_interpolation(
+                frame.width, frame.height, width, height
+            )
+        img = _frame_to_view(self._reformat(
+            frame, width=width, height=height, format=BGR_FORMAT, interpolation=interpolation
+        ))
         
-        # Extract source face on first frame
-        if self.source_face is None:
-            faces = self.swap_engine.detect_faces(img)
-            if faces:
-                self.source_face = faces[0]
-                logger.info("Source face detected and stored")
+        # Detection, swap and the numpy pre/post passes all block; run them
+        # on the worker pool so the loop keeps serving RTP/RTCP, ICE and
+        # signaling for every peer in the meantime
+        if self.batcher is None:
+            img = await loop.run_in_executor(self.infer_pool, self._process_sync, img)
+        else:
+            img, target_face = await loop.run_in_executor(self.infer_pool, self._prepare_sync, img)
+            if target_face is not None:
+                try:
+                    img = await self.batcher.submit((img, self._source_embedding, target_face))
+                except Exception as e:
+                    self._log_swap_error(e)
+            img = self._postprocess(img)
+        
+        # Convert back to VideoFrame
+        return self._finish(frame, self._output_frame(img))
+    
+    def _finish(self, frame: VideoFrame, new_frame: VideoFrame) -> VideoFrame:
+        """Carry the input timing over to the output frame and count it."""
+        new_frame.pts = frame.pts
+        new_frame.time_base = frame.time_base
+        
+        self.frame_count += 1
+        if (self.frame_count & 31) == 0 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Processed %d frames, dropped %d", self.frame_count, self.dropped_frames)
+        
+        return new_frame
+    
+    def _roi_eligible(self, frame: VideoFrame) -> bool:
+        """
+        Whether the frame can take the YUV fast path.
+        
+        That needs a face the tracker can predict (no detector run due on
+        this frame) from frames of the same size, a yuv420p frame at its
+        original size, and no cross-session batching.
+        """
+        return (
+            self._source_embedding is not None
+            and not self._tracker.lost
+            and (frame.width, frame.height) == self._tracker.frame_size
+            and self._frames_since_detect + 1 < self._detect_interval
+            and self.frame_processor.target_size is None
+            and self.batcher is None
+            and frame.format.name == YUV_FORMAT
+        )
+    
+    def _yuv_output(self, width: int, height: int) -> Tuple[VideoFrame, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Return the reused yuv420p output frame and its plane views."""
+        if self._yuv_frame is None or (self._yuv_frame.width, self._yuv_frame.height) != (width, height):
+            self._yuv_frame = VideoFrame(width, height, YUV_FORMAT)
+            self._yuv_views = _yuv420_views(self._yuv_frame)
+        return self._yuv_frame, self._yuv_views
+    
+    def _process_roi_sync(self, frame: VideoFrame) -> Optional[VideoFrame]:
+        """
+        Swap the tracked face in a yuv420p frame, converting only its region.
+        
+        The planes are copied to the output frame as they are; only the
+        region around the face goes YUV -> BGR, through the swap and back.
+        Runs on a worker thread. The decoder's frame is only read.
+        
+        Args:
+            frame: Input frame (yuv420p)
+            
+        Returns:
+            Output frame (yuv420p), or None to use the full-frame path
+        """
+        # The tracker is advanced once per frame; if this path bails out, the
+        # full-frame path picks up the same prediction instead of advancing
+        # (and moving the box) again
+        self._frames_since_detect += 1
+        face = self._tracker.predict()
+        if face is None or face.get('kps') is None:
+            self._predicted = face
+            return None
+        
+        # Face box plus margin, on even coordinates so it maps onto whole
+        # chroma samples
+        width, height = frame.width, frame.height
+        x1, y1, x2, y2 = face['bbox']
+        mx, my = (x2 - x1) * ROI_MARGIN, (y2 - y1) * ROI_MARGIN
+        x0 = max(int(x1 - mx), 0) & ~1
+        y0 = max(int(y1 - my), 0) & ~1
+        x3 = min(int(x2 + mx) + 1, width) & ~1
+        y3 = min(int(y2 + my) + 1, height) & ~1
+        rw, rh = x3 - x0, y3 - y0
+        if rw < 4 or rh < 4:
+            self._predicted = face
+            return None
+        
+        out, (out_y, out_u, out_v) = self._yuv_output(width, height)
+        src_y, src_u, src_v = _yuv420_views(frame)
+        np.copyto(out_y, src_y)
+        np.copyto(out_u, src_u)
+        np.copyto(out_v, src_v)
+        
+        # Gather the region into a contiguous I420 buffer for OpenCV
+        if self._roi_i420 is None or self._roi_i420.shape != (rh * 3 // 2, rw):
+            self._roi_i420 = np.empty((rh * 3 // 2, rw), dtype=np.uint8)
+        flat = self._roi_i420.reshape(-1)
+        luma, chroma = rh * rw, (rh // 2) * (rw // 2)
+        roi_y = flat[:luma].reshape(rh, rw)
+        roi_u = flat[luma:luma + chroma].reshape(rh // 2, rw // 2)
+        roi_v = flat[luma + chroma:].reshape(rh // 2, rw // 2)
+        cx0, cy0, cx3, cy3 = x0 // 2, y0 // 2, x3 // 2, y3 // 2
+        np.copyto(roi_y, src_y[y0:y3, x0:x3])
+        np.copyto(roi_u, src_u[cy0:cy3, cx0:cx3])
+        np.copyto(roi_v, src_v[cy0:cy3, cx0:cx3])
         
-        # Perform face swap if source face is available
-        if self.source_face is not None:
+        if self._roi_bgr is None or self._roi_bgr.shape != (rh, rw, 3):
+            self._roi_bgr = np.empty((rh, rw, 3), dtype=np.uint8)
+        bgr = cv2.cvtColor(self._roi_i420, cv2.COLOR_YUV2BGR_I420, dst=self._roi_bgr)
+        
+        # Face coordinates relative to the region
+        offset = np.array([x0, y0], dtype=np.float32)
+        face['bbox'] = face['bbox'] - np.array([x0, y0, x0, y0])
+        face['kps'] = face['kps'] - offset
+        try:
+            bgr = self._swap(target_frame=bgr, source_embedding=self._source_embedding, target_face=face)
+        except Exception as e:
+            self._log_swap_error(e)
+        
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2YUV_I420, dst=self._roi_i420)
+        np.copyto(out_y[y0:y3, x0:x3], roi_y)
+        np.copyto(out_u[cy0:cy3, cx0:cx3], roi_u)
+        np.copyto(out_v[cy0:cy3, cx0:cx3], roi_v)
+        return out
+    
+    def _output_frame(self, img: np.ndarray) -> VideoFrame:
+        """Copy a BGR image into the reused output frame and return it."""
+        h, w = img.shape[:2]
+        if self._out_frame is None or (self._out_frame.width, self._out_frame.height) != (w, h):
+            self._out_frame = VideoFrame(w, h, BGR_FORMAT)
+            self._out_view = _frame_to_view(self._out_frame)
+        np.copyto(self._out_view, img)
+        return self._out_frame
+    
+    def stop(self):
+        """Stop the track and its capture task."""
+        super().stop()
+        if self._capture_task is not None:
+            self._capture_task.cancel()
+            self._capture_task = None
+    
+    def _process_sync(self, img: np.ndarray) -> np.ndarray:
+        """
+        Preprocess, swap and postprocess one BGR frame.
+        
+        Runs on a worker thread. The track only has one frame in flight at a
+        time, so the per-track state touched here is never shared.
+        
+        Args:
+            img: Input frame (BGR format)
+            
+        Returns:
+            Processed frame (BGR format)
+        """
+        img, target_face = self._prepare_sync(img)
+        
+        # Perform face swap if a target face was found
+        if target_face is not None:
             try:
-                img = self.swap_engine.swap_face(
-                    source_frame=img,  # Using same frame for now
+                img = self._swap(
                     target_frame=img,
-                    source_face=self.source_face,
-                    target_face=None
+                    source_embedding=self._source_embedding,
+                    target_face=target_face
                 )
             except Exception as e:
-                logger.error(f"Face swap error: {e}")
+                self._log_swap_error(e)
         
         # Postprocess frame
-        img = self.frame_processor.postprocess_frame(img)
+        return self._postprocess(img)
+    
+    def _prepare_sync(self, img: np.ndarray) -> Tuple[np.ndarray, Optional[dict]]:
+        """
+        Preprocess a frame and locate the face to swap in it.
         
-        # Convert back to VideoFrame
-        new_frame = VideoFrame.from_ndarray(img, format="bgr24")
-        new_frame.pts = frame.pts
-        new_frame.time_base = frame.time_base
+        Args:
+            img: Input frame (BGR format)
+            
+        Returns:
+            Preprocessed frame and the target face, or None when there is
+            no source identity yet or no face in the frame
+        """
+        # Preprocess frame
+        img = self._preprocess(img)
         
-        self.frame_count += 1
-        if self.frame_count % 30 == 0:
-            logger.debug(f"Processed {self.frame_count} frames")
+        # Extract source face on first frame; its identity latent is computed
+        # once here rather than re-derived from the source face every frame
+        if self.source_face is None:
+            faces = self._detect(img)
+            if faces:
+                self.source_face = faces[0]
+                self._source_embedding = self.swap_engine.compute_embedding(img, self.source_face)
+                logger.info("Source face detected and stored")
         
-        return new_frame
+        if self._source_embedding is None:
+            return img, None
+        try:
+            return img, self._track_target(img)
+        except Exception as e:
+            self._log_swap_error(e)
+            return img, None
+    
+    def _log_swap_error(self, error: Exception):
+        """Log a per-frame swap error, at most once per ERROR_LOG_INTERVAL."""
+        now = time.monotonic()
+        if now - self._last_error_log < ERROR_LOG_INTERVAL:
+            self._suppressed_errors += 1
+            return
+        logger.error("Face swap error: %s (%d similar suppressed)", error, self._suppressed_errors)
+        self._last_error_log = now
+        self._suppressed_errors = 0
+    
+    def _track_target(self, img: np.ndarray) -> Optional[dict]:
+        """Locate the target face, running the detector only every few frames."""
+        face, self._predicted = self._predicted, None
+        height, width = img.shape[:2]
+        if self._tracker.set_frame_size((width, height)):
+            # Resolution changed: the track is gone, detect on this frame
+            self._frames_since_detect = 0
+            face = None
+        if face is not None:
+            return face
+        self._frames_since_detect += 1
+        if self._tracker.lost or self._frames_since_detect >= self._detect_interval:
+            self._frames_since_detect = 0
+            return self._tracker.update(self._detect(img, with_embedding=False))
+        return self._tracker.predict()
 
 
 class WebRTCServer:
-    """WebRTC server for handling peer connections."""
+    """
+    WebRTC server for handling peer connections.
+    
+    All peer connections and tracks live on the server's own event loop,
+    running on a dedicated thread, so ICE/DTLS/RTCP timers are not delayed
+    by work on the application loop (HTTP API, signaling, health reports).
+    The public coroutines can be awaited from any loop.
+    """
     
     def __init__(self, swap_engine: SwapEngine, frame_processor: FrameProcessor):
         """
@@ -95,11 +440,53 @@ class WebRTCServer:
         self.frame_processor = frame_processor
         self.pcs = set()  # Set of peer connections
         self.relay = MediaRelay()
+        # Connections currently in the "connected" state, maintained by the
+        # state change handlers so health checks do not scan self.pcs
+        self._active = 0
+        # Shared by all tracks; size it to what the GPU can overlap
+        self._infer_pool = ThreadPoolExecutor(
+            max_workers=config.infer_workers, thread_name_prefix="frame"
+        )
+        # Pay the first-inference cost now instead of on the first frames of
+        # the first call
+        self._warmup_workers(config.infer_workers)
+        # Cross-session batching only pays off with several concurrent peers
+        self._batcher: Optional[AsyncBatcher] = None
+        if config.enable_batching:
+            self._batcher = AsyncBatcher(
+                self.swap_engine.swap_batch, self._infer_pool, max_batch=config.batch_size
+            )
+        
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="webrtc", daemon=True)
+        self._thread.start()
+    
+    def _warmup_workers(self, workers: int):
+        """
+        Run the engine warm-up once on every inference thread.
+        
+        IOBinding buffers are per thread, so each worker has to warm up
+        itself. The tasks wait for each other before starting, which forces
+        the pool to start one thread per task.
+        """
+        barrier = threading.Barrier(workers)
+        
+        def warmup():
+            barrier.wait()
+            self.swap_engine.warmup()
+        
+        for future in [self._infer_pool.submit(warmup) for _ in range(workers)]:
+            future.result()
+    
+    async def _run_on_loop(self, coro):
+        """Run a coroutine on the server loop and await its result from the caller's loop."""
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self._loop))
     
     async def create_peer_connection(self) -> RTCPeerConnection:
-        """Create a new peer connection."""
+        """Create a new peer connection. Must run on the server loop."""
         pc = RTCPeerConnection()
         self.pcs.add(pc)
+        connected = False  # whether this pc is counted in self._active
         
         @pc.on("track")
         def on_track(track):
@@ -111,7 +498,9 @@ class WebRTCServer:
                 processed_track = ProcessedVideoTrack(
                     self.swap_engine,
                     self.frame_processor,
-                    track
+                    track,
+                    self._infer_pool,
+                    self._batcher
                 )
                 pc.addTrack(processed_track)
                 logger.info("Added processed video track")
@@ -119,10 +508,16 @@ class WebRTCServer:
         @pc.on("connectionstatechange")
         async def on_connectionstatechange():
             """Handle connection state changes."""
+            nonlocal connected
             logger.info(f"Connection state: {pc.connectionState}")
+            is_connected = pc.connectionState == "connected"
+            if is_connected != connected:
+                self._active += 1 if is_connected else -1
+                connected = is_connected
             if pc.connectionState in ["failed", "closed"]:
-                await pc.close()
+                # close_all may already have taken this pc out of the set
                 self.pcs.discard(pc)
+                await pc.close()
         
         return pc
     
@@ -136,6 +531,10 @@ class WebRTCServer:
         Returns:
             SDP answer string
         """
+        return await self._run_on_loop(self._handle_offer(offer_sdp))
+    
+    async def _handle_offer(self, offer_sdp: str) -> str:
+        """Create the peer connection and answer on the server loop."""
         pc = await self.create_peer_connection()
         
         # Create offer from SDP
@@ -151,12 +550,29 @@ class WebRTCServer:
     
     async def close_all(self):
         """Close all peer connections."""
-        for pc in self.pcs:
-            await pc.close()
+        await self._run_on_loop(self._close_all())
+    
+    async def _close_all(self):
+        """Close all peer connections on the server loop."""
+        # Iterate a snapshot: state change handlers remove closed peers from
+        # self.pcs while this loop is suspended in pc.close()
+        pcs = list(self.pcs)
         self.pcs.clear()
+        for pc in pcs:
+            await pc.close()
+        if self._batcher is not None:
+            await self._batcher.stop()
         logger.info("All peer connections closed")
     
+    def stop(self):
+        """Stop the server loop and its thread. Call after close_all()."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+        self._infer_pool.shutdown(wait=False)
+    
     def get_active_connections(self) -> int:
         """Get number of active connections."""
-        return len([pc for pc in self.pcs if pc.connectionState == "connected"])
+        return self._active
 
@@ -0,0 +1,121 @@
+"""
+Tests for the cross-session request batcher.
+"""
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.batcher import AsyncBatcher
+
+
+class RecordingProcessor:
+    """process_batch stand-in that records the batches it is given."""
+    
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+    
+    def __call__(self, items):
+        self.batches.append(list(items))
+        self.release.wait(timeout=5)
+        return [item * 10 for item in items]
+
+
+class AsyncBatcherTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for AsyncBatcher."""
+    
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.process = RecordingProcessor()
+    
+    def tearDown(self):
+        self.process.release.set()
+        self.executor.shutdown(wait=True)
+    
+    async def asyncTearDown(self):
+        await self.batcher.stop()
+    
+    def _batcher(self, max_batch=8, window=0.05):
+        self.batcher = AsyncBatcher(self.process, self.executor, max_batch=max_batch, window=window)
+        return self.batcher
+    
+    async def test_single_item(self):
+        batcher = self._batcher()
+        self.assertEqual(await batcher.submit(1), 10)
+        self.assertEqual(self.process.batches, [[1]])
+    
+    async def test_results_in_submission_order(self):
+        batcher = self._batcher()
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        self.assertEqual(results, [0, 10, 20, 30, 40])
+        self.assertEqual(self.process.batches, [[0, 1, 2, 3, 4]])
+    
+    async def test_max_batch_splits_batches(self):
+        batcher = self._batcher(max_batch=3, window=0.2)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+        self.assertEqual(results, [i * 10 for i in range(7)])
+        self.assertEqual(self.process.batches, [[0, 1, 2], [3, 4, 5], [6]])
+    
+    async def test_window_closes_batch(self):
+        batcher = self._batcher(window=0.01)
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.1)
+        second = asyncio.ensure_future(batcher.submit(2))
+        self.assertEqual(await asyncio.gather(first, second), [10, 20])
+        self.assertEqual(self.process.batches, [[1], [2]])
+    
+    async def test_items_arriving_during_a_batch_form_the_next(self):
+        batcher = self._batcher(window=0.01)
+        self.process.release.clear()
+        first = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.05)  # batch [1] is now running
+        rest = [asyncio.ensure_future(batcher.submit(i)) for i in (2, 3)]
+        await asyncio.sleep(0)
+        self.process.release.set()
+        self.assertEqual(await asyncio.gather(first, *rest), [10, 20, 30])
+        self.assertEqual(self.process.batches, [[1], [2, 3]])
+    
+    async def test_exception_fans_out_to_batch(self):
+        def fail(items):
+            raise RuntimeError("boom")
+        
+        self.batcher = AsyncBatcher(fail, self.executor, window=0.05)
+        results = await asyncio.gather(
+            *(self.batcher.submit(i) for i in range(3)), return_exceptions=True
+        )
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+        
+        # The batching task survives a failed batch
+        self.batcher.process_batch = self.process
+        self.assertEqual(await self.batcher.submit(4), 40)
+    
+    async def test_stop_cancels_in_flight_and_queued_items(self):
+        batcher = self._batcher(max_batch=2, window=0.01)
+        self.process.release.clear()
+        futures = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.05)  # batch [0, 1] is running, 2 is queued
+        await batcher.stop()
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        for result in results:
+            self.assertIsInstance(result, asyncio.CancelledError)
+        self.assertEqual(self.process.batches, [[0, 1]])
+    
+    async def test_submit_after_stop_restarts(self):
+        batcher = self._batcher()
+        self.assertEqual(await batcher.submit(1), 10)
+        await batcher.stop()
+        self.assertEqual(await batcher.submit(2), 20)
+    
+    async def test_max_batch_is_at_least_one(self):
+        batcher = self._batcher(max_batch=0)
+        self.assertEqual(batcher.max_batch, 1)
+        self.assertEqual(await asyncio.gather(batcher.submit(1), batcher.submit(2)), [10, 20])
+        self.assertEqual(self.process.batches, [[1], [2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Tests for the IOU face tracker.
+"""
+import unittest
+
+import numpy as np
+
+from src.face_tracker import IOUTracker, _iou
+
+
+def _face(x1, y1, x2, y2, score=0.9, kps=True):
+    """Face dictionary as returned by SwapEngine.detect_faces."""
+    face = {'bbox': np.array([x1, y1, x2, y2]), 'det_score': score}
+    if kps:
+        face['kps'] = np.array([[x1 + 10, y1 + 10], [x2 - 10, y2 - 10]], dtype=np.float32)
+    return face
+
+
+class IOUTest(unittest.TestCase):
+    """Tests for _iou."""
+    
+    def test_identical_boxes(self):
+        box = np.array([0, 0, 10, 10])
+        self.assertAlmostEqual(_iou(box, box), 1.0)
+    
+    def test_partial_overlap(self):
+        # 5x10 overlap over a 150 px union
+        self.assertAlmostEqual(_iou(np.array([0, 0, 10, 10]), np.array([5, 0, 15, 10])), 50 / 150)
+    
+    def test_disjoint_and_touching_boxes(self):
+        self.assertEqual(_iou(np.array([0, 0, 10, 10]), np.array([20, 20, 30, 30])), 0.0)
+        self.assertEqual(_iou(np.array([0, 0, 10, 10]), np.array([10, 0, 20, 10])), 0.0)
+
+
+class IOUTrackerTest(unittest.TestCase):
+    """Tests for IOUTracker."""
+    
+    def setUp(self):
+        self.tracker = IOUTracker(iou_threshold=0.3)
+    
+    def test_starts_lost(self):
+        self.assertTrue(self.tracker.lost)
+        self.assertIsNone(self.tracker.predict())
+    
+    def test_first_update_picks_most_confident(self):
+        face = self.tracker.update([_face(0, 0, 50, 50, score=0.6), _face(100, 100, 150, 150, score=0.95)])
+        self.assertFalse(self.tracker.lost)
+        np.testing.assert_array_equal(face['bbox'], [100, 100, 150, 150])
+    
+    def test_update_continues_best_overlap(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        # The more confident detection does not overlap the track
+        face = self.tracker.update([_face(300, 300, 350, 350, score=0.99), _face(104, 100, 154, 150, score=0.5)])
+        np.testing.assert_array_equal(face['bbox'], [104, 100, 154, 150])
+    
+    def test_update_below_threshold_loses_track(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.assertIsNone(self.tracker.update([_face(140, 140, 190, 190)]))
+        self.assertTrue(self.tracker.lost)
+    
+    def test_update_at_threshold_keeps_track(self):
+        self.tracker = IOUTracker(iou_threshold=50 / 150)
+        self.tracker.update([_face(0, 0, 10, 10)])
+        self.assertIsNotNone(self.tracker.update([_face(5, 0, 15, 10)]))
+    
+    def test_empty_detections_reset(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.assertIsNone(self.tracker.update([]))
+        self.assertTrue(self.tracker.lost)
+        self.assertIsNone(self.tracker.predict())
+        # A new track starts from scratch, without the old velocity
+        self.tracker.update([_face(0, 0, 50, 50)])
+        np.testing.assert_array_equal(self.tracker.predict()['bbox'], [0, 0, 50, 50])
+    
+    def test_predict_without_motion_keeps_box(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        face = self.tracker.predict()
+        np.testing.assert_array_equal(face['bbox'], [100, 100, 150, 150])
+        np.testing.assert_allclose(face['kps'], [[110, 110], [140, 140]])
+    
+    def test_predict_shifts_box_and_keypoints_by_velocity(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.tracker.update([_face(104, 102, 154, 152)])
+        first = self.tracker.predict()
+        np.testing.assert_array_equal(first['bbox'], [108, 104, 158, 154])
+        np.testing.assert_allclose(first['kps'], [[118, 114], [148, 144]])
+        second = self.tracker.predict()
+        np.testing.assert_array_equal(second['bbox'], [112, 106, 162, 156])
+        np.testing.assert_allclose(second['kps'], [[122, 116], [152, 146]])
+    
+    def test_predict_does_not_modify_tracked_face(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.tracker.update([_face(104, 100, 154, 150)])
+        self.tracker.predict()
+        face = self.tracker.predict()
+        self.assertIsNot(face['kps'], self.tracker._face['kps'])
+        np.testing.assert_allclose(self.tracker._face['kps'], [[114, 110], [144, 140]])
+    
+    def test_predict_without_keypoints(self):
+        self.tracker.update([_face(100, 100, 150, 150, kps=False)])
+        face = self.tracker.predict()
+        self.assertIsNone(face.get('kps'))
+    
+    def test_velocity_spread_over_predicted_frames(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.tracker.predict()
+        self.tracker.predict()
+        # Moved 6 px in x over the three frames since the last detection
+        self.tracker.update([_face(106, 100, 156, 150)])
+        np.testing.assert_array_equal(self.tracker.predict()['bbox'], [108, 100, 158, 150])
+    
+    def test_update_matches_against_predicted_box(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.tracker.update([_face(120, 100, 170, 150)])
+        for _ in range(3):
+            self.tracker.predict()
+        # Far from the last detection, but where the velocity puts the face
+        face = self.tracker.update([_face(200, 100, 250, 150)])
+        self.assertIsNotNone(face)
+    
+    def test_first_frame_size_keeps_track(self):
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.assertTrue(self.tracker.set_frame_size((640, 480)))
+        self.assertEqual(self.tracker.frame_size, (640, 480))
+        self.assertFalse(self.tracker.set_frame_size((640, 480)))
+        self.tracker.update([_face(100, 100, 150, 150)])
+        self.assertFalse(self.tracker.set_frame_size((640, 480)))
+        self.assertFalse(self.tracker.lost)
+    
+    def test_frame_size_change_resets_track(self):
+        self.tracker.set_frame_size((1280, 720))
+        self.tracker.update([_face(600, 300, 700, 400)])
+        self.tracker.update([_face(604, 300, 704, 400)])
+        self.assertTrue(self.tracker.set_frame_size((640, 360)))
+        self.assertEqual(self.tracker.frame_size, (640, 360))
+        self.assertTrue(self.tracker.lost)
+        self.assertIsNone(self.tracker.predict())
+        # The next detection starts a fresh track at the new scale
+        self.tracker.update([_face(300, 150, 350, 200)])
+        np.testing.assert_array_equal(self.tracker.predict()['bbox'], [300, 150, 350, 200])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Tests for the periodic job scheduler.
+"""
+import asyncio
+import unittest
+
+from src.scheduler import PeriodicScheduler
+
+
+class PeriodicSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    """Tests for PeriodicScheduler."""
+    
+    def setUp(self):
+        self.scheduler = PeriodicScheduler()
+        self.runs = []
+    
+    async def asyncTearDown(self):
+        await self.scheduler.stop()
+    
+    def _job(self, name):
+        """Coroutine function that records its runs."""
+        async def job():
+            self.runs.append(name)
+        return job
+    
+    async def test_runs_jobs_in_deadline_order(self):
+        self.scheduler.every(0.05, self._job('slow'))
+        self.scheduler.every(0.02, self._job('fast'))
+        self.scheduler.start()
+        await asyncio.sleep(0.13)
+        self.assertEqual(self.runs[:3], ['fast', 'fast', 'slow'])
+        self.assertEqual(self.runs.count('slow'), 2)
+        self.assertGreaterEqual(self.runs.count('fast'), 4)
+    
+    async def test_failing_job_keeps_running(self):
+        async def fail():
+            self.runs.append('fail')
+            raise RuntimeError("boom")
+        
+        self.scheduler.every(0.02, fail)
+        self.scheduler.start()
+        await asyncio.sleep(0.07)
+        self.assertGreaterEqual(self.runs.count('fail'), 2)
+    
+    async def test_every_after_start_raises(self):
+        self.scheduler.every(1.0, self._job('first'))
+        self.scheduler.start()
+        with self.assertRaises(RuntimeError):
+            self.scheduler.every(0.01, self._job('late'))
+        # The registered job is left alone
+        self.assertEqual(len(self.scheduler._jobs), 1)
+    
+    async def test_every_after_stop_is_allowed(self):
+        self.scheduler.start()
+        await self.scheduler.stop()
+        self.scheduler.every(0.01, self._job('again'))
+        self.scheduler.start()
+        await asyncio.sleep(0.03)
+        self.assertIn('again', self.runs)
+    
+    async def test_stop_cancels_sleeping_task(self):
+        self.scheduler.every(10.0, self._job('never'))
+        self.scheduler.start()
+        await asyncio.sleep(0)
+        await self.scheduler.stop()
+        self.assertEqual(self.runs, [])
+
+
+if __name__ == '__main__':
+    unittest.main()